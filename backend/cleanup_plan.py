@@ -0,0 +1,253 @@
+# Cleanup-Plan - Analyse-Ergebnisse in minimale Gmail-Operationen übersetzen
+# Label + Trash werden pro Nachrichtengruppe zu einem batchModify zusammengefasst,
+# Unsubscribes pro URL nur einmal ausgeführt.
+
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+
+# Gmail erlaubt maximal 1000 IDs pro batchModify
+BATCH_MODIFY_LIMIT = 1000
+
+
+class LabelCache:
+    """Label-IDs einmal auflösen statt bei jedem Namenskonflikt neu zu listen"""
+
+    def __init__(self, service):
+        self.service = service
+        self._label_ids = None
+
+    def invalidate(self):
+        """Cache verwerfen (z.B. Label in Gmail gelöscht oder umbenannt)"""
+        self._label_ids = None
+
+    def get_or_create(self, label_name: str) -> str:
+        """Label-ID per Name holen, Label nur anlegen wenn es fehlt"""
+        try:
+            if self._label_ids is None:
+                labels = self.service.users().labels().list(userId='me').execute()
+                self._label_ids = {
+                    label['name']: label['id'] for label in labels.get('labels', [])
+                }
+
+            if label_name not in self._label_ids:
+                label_object = {
+                    'name': label_name,
+                    'messageListVisibility': 'show',
+                    'labelListVisibility': 'labelShow'
+                }
+                label = self.service.users().labels().create(
+                    userId='me',
+                    body=label_object
+                ).execute()
+                print(f"🏷️  Label erstellt: {label_name}")
+                self._label_ids[label_name] = label['id']
+
+            return self._label_ids[label_name]
+
+        except HttpError as error:
+            print(f"❌ Fehler beim Label erstellen: {error}")
+            return ""
+
+
+class CleanupPlan:
+    """Expliziter Plan aller Cleanup-Aktionen - prüfbar als Dry Run, ausführbar mit minimalen Calls"""
+
+    def __init__(self, label_name: str = ""):
+        self.label_name = label_name
+        # msg_id -> {'label', 'trash', 'size_mb', 'requires_unsubscribe': [urls]}
+        self.messages: Dict[str, Dict] = {}
+        # url -> {'from', 'email_ids'}
+        self.unsubscribes: Dict[str, Dict] = {}
+
+    def add_message(self, email_id: str, label: bool = False, trash: bool = False,
+                    size_mb: float = 0.0, requires_unsubscribe: str = ""):
+        """Aktionen für eine Nachricht vormerken (mehrfache Einträge werden zusammengeführt)"""
+        entry = self.messages.setdefault(email_id, {
+            'label': False,
+            'trash': False,
+            'size_mb': 0.0,
+            'requires_unsubscribe': []
+        })
+        entry['label'] = entry['label'] or label
+        entry['trash'] = entry['trash'] or trash
+        entry['size_mb'] = max(entry['size_mb'], size_mb)
+        # Jede Bedingung bleibt erhalten - alle Unsubscribes müssen klappen
+        if requires_unsubscribe and requires_unsubscribe not in entry['requires_unsubscribe']:
+            entry['requires_unsubscribe'].append(requires_unsubscribe)
+
+    def add_unsubscribe(self, url: str, email_id: str, sender: str = ""):
+        """Unsubscribe vormerken - jede URL wird nur einmal aufgerufen"""
+        if not url:
+            return
+        entry = self.unsubscribes.setdefault(url, {'from': sender, 'email_ids': []})
+        if email_id not in entry['email_ids']:
+            entry['email_ids'].append(email_id)
+
+    @classmethod
+    def from_analysis(cls, analysis: Dict, label_name: str = "",
+                      auto_unsubscribe: bool = False, auto_delete: bool = False) -> 'CleanupPlan':
+        """Plan aus dem Ergebnis von analyze_inbox erstellen"""
+        plan = cls(label_name)
+
+        for newsletter in analysis.get('newsletters', []):
+            # Thread-Analysen bringen alle Nachrichten-IDs des Threads mit -
+            # die landen im selben batchModify wie Einzel-Emails
+            message_ids = newsletter.get('message_ids') or [newsletter['id']]
+            for i, message_id in enumerate(message_ids):
+                plan.add_message(
+                    message_id,
+                    label=bool(label_name),
+                    trash=auto_delete,
+                    size_mb=newsletter.get('size_mb', 0) if i == 0 else 0.0
+                )
+            if auto_unsubscribe:
+                plan.add_unsubscribe(
+                    newsletter.get('unsubscribe_link', ''),
+                    newsletter['id'],
+                    newsletter.get('from', '')
+                )
+
+        return plan
+
+    def _modification_groups(self, email_ids: List[str]) -> Dict[tuple, List[str]]:
+        """Nachrichten nach identischer Label/Trash-Kombination gruppieren"""
+        groups = {}
+        for email_id in email_ids:
+            entry = self.messages[email_id]
+            key = (entry['label'] and bool(self.label_name), entry['trash'])
+            if key == (False, False):
+                continue
+            groups.setdefault(key, []).append(email_id)
+        return groups
+
+    def estimated_api_calls(self) -> int:
+        """Gmail-Calls im Best Case (alle Unsubscribes erfolgreich)"""
+        calls = 0
+        groups = self._modification_groups(list(self.messages))
+        if any(label for label, _ in groups):
+            calls += 1  # labels.list (einmalig)
+        for ids in groups.values():
+            calls += -(-len(ids) // BATCH_MODIFY_LIMIT)
+        return calls
+
+    def to_dict(self) -> Dict:
+        """Plan als JSON-taugliches Dict (Dry Run)"""
+        groups = self._modification_groups(list(self.messages))
+        return {
+            'created': datetime.now().isoformat(),
+            'label_name': self.label_name,
+            'summary': {
+                'messages': len(self.messages),
+                'to_label': sum(len(ids) for (label, _), ids in groups.items() if label),
+                'to_trash': sum(len(ids) for (_, trash), ids in groups.items() if trash),
+                'unsubscribe_urls': len(self.unsubscribes),
+                'space_freed_mb': sum(
+                    entry['size_mb'] for entry in self.messages.values() if entry['trash']
+                ),
+                'estimated_gmail_calls': self.estimated_api_calls()
+            },
+            'unsubscribes': [
+                {'url': url, 'from': entry['from'], 'email_ids': entry['email_ids']}
+                for url, entry in self.unsubscribes.items()
+            ],
+            'modifications': [
+                {'label': self.label_name if label else None, 'trash': trash, 'email_ids': ids}
+                for (label, trash), ids in groups.items()
+            ]
+        }
+
+    def save(self, path: str = 'cleanup_plan.json'):
+        """Plan als JSON exportieren"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def execute(self, service, unsubscribe: Callable[[str, str], bool],
+                label_cache: Optional[LabelCache] = None) -> Dict:
+        """Plan ausführen: erst Unsubscribes, dann zusammengefasste Label/Trash-Modifikationen"""
+        result = {
+            'unsubscribe_results': {},
+            'labeled': [],
+            'trashed': [],
+            'failed': [],
+            'skipped': [],
+            'space_freed_mb': 0.0,
+            'batch_calls': 0
+        }
+
+        # 1. Unsubscribes - jede URL genau einmal
+        for url, entry in self.unsubscribes.items():
+            result['unsubscribe_results'][url] = unsubscribe(url, entry['from'])
+
+        # 2. Nachrichten deren Unsubscribe fehlgeschlagen ist nicht anfassen
+        email_ids = []
+        for email_id, entry in self.messages.items():
+            if not all(result['unsubscribe_results'].get(url, False)
+                       for url in entry['requires_unsubscribe']):
+                result['skipped'].append(email_id)
+            else:
+                email_ids.append(email_id)
+
+        groups = self._modification_groups(email_ids)
+
+        # 3. Label-ID einmalig auflösen
+        label_id = ""
+        if any(label for label, _ in groups):
+            if label_cache is None:
+                label_cache = LabelCache(service)
+            label_id = label_cache.get_or_create(self.label_name)
+
+        # 4. Label + Trash pro Gruppe in einem batchModify
+        for (label, trash), ids in groups.items():
+            add_label_ids = []
+            if label and label_id:
+                add_label_ids.append(label_id)
+            if trash:
+                add_label_ids.append('TRASH')
+            if not add_label_ids:
+                result['failed'].extend(ids)
+                continue
+
+            for start in range(0, len(ids), BATCH_MODIFY_LIMIT):
+                chunk = ids[start:start + BATCH_MODIFY_LIMIT]
+                modified = False
+                for attempt in range(2):
+                    try:
+                        service.users().messages().batchModify(
+                            userId='me',
+                            body={'ids': chunk, 'addLabelIds': add_label_ids}
+                        ).execute()
+                        result['batch_calls'] += 1
+                        modified = True
+                        break
+                    except HttpError as error:
+                        result['batch_calls'] += 1
+                        # Label in Gmail gelöscht/umbenannt? Cache verwerfen, einmal neu auflösen
+                        if attempt == 0 and label_id in add_label_ids and 'label' in str(error).lower():
+                            label_cache.invalidate()
+                            new_label_id = label_cache.get_or_create(self.label_name)
+                            add_label_ids = [new_label_id if x == label_id else x for x in add_label_ids]
+                            label_id = new_label_id
+                            continue
+                        print(f"❌ Fehler bei batchModify ({len(chunk)} Emails): {error}")
+                        break
+
+                if not modified:
+                    result['failed'].extend(chunk)
+                    continue
+
+                if label and label_id:
+                    result['labeled'].extend(chunk)
+                if trash:
+                    result['trashed'].extend(chunk)
+                    result['space_freed_mb'] += sum(
+                        self.messages[email_id]['size_mb'] for email_id in chunk
+                    )
+
+                # Rate limiting
+                time.sleep(0.1)
+
+        return result
@@ -2,12 +2,13 @@
 # pip install flask flask-cors
 
 import os
+import re
 import pickle
 import base64
 import time
 import requests
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 
 from google.auth.transport.requests import Request
@@ -16,6 +17,10 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from cleanup_plan import CleanupPlan, LabelCache
+from unsubscribe_cache import UnsubscribeCache
+from profiling import Profiler
+
 app = Flask(__name__)
 CORS(app)  # Ermöglicht Frontend-Backend Kommunikation
 
@@ -27,6 +32,8 @@ class GmailAPI:
             'https://www.googleapis.com/auth/gmail.labels'
         ]
         self.service = None
+        self.label_cache = None
+        self.unsubscribe_cache = UnsubscribeCache()
         self.authenticate()
     
     def authenticate(self):
@@ -49,6 +56,7 @@ class GmailAPI:
                 pickle.dump(creds, token)
         
         self.service = build('gmail', 'v1', credentials=creds)
+        self.label_cache = LabelCache(self.service)
         print("✅ Gmail API connected")
         return True
     
@@ -87,6 +95,78 @@ class GmailAPI:
             print(f"❌ Error deleting email: {error}")
             return False
     
+    def get_thread_details(self, thread_id):
+        """Thread-Details über die Metadaten der neuesten Nachricht abrufen"""
+        try:
+            thread = self.service.users().threads().get(
+                userId='me',
+                id=thread_id,
+                format='metadata',
+                metadataHeaders=['From', 'Subject', 'List-Unsubscribe']
+            ).execute()
+            
+            messages = thread.get('messages', [])
+            if not messages:
+                return None
+            newest = max(messages, key=lambda m: int(m.get('internalDate', 0)))
+            
+            headers = {}
+            for header in newest['payload'].get('headers', []):
+                headers[header['name'].lower()] = header['value']
+            
+            return {
+                'id': thread_id,
+                'subject': headers.get('subject', 'Kein Betreff'),
+                'from': headers.get('from', 'Unbekannt'),
+                'headers': headers,
+                'labels': newest.get('labelIds', []),
+                'message_ids': [message['id'] for message in messages]
+            }
+        except HttpError as error:
+            print(f"❌ Error getting thread details: {error}")
+            return None
+    
+    def find_unsubscribe_url(self, email_details):
+        """Unsubscribe-URL aus List-Unsubscribe Header extrahieren"""
+        list_unsubscribe = email_details['headers'].get('list-unsubscribe', '')
+        if list_unsubscribe:
+            url_match = re.search(r'<(https?://[^>]+)>', list_unsubscribe)
+            if url_match:
+                return url_match.group(1)
+        return None
+    
+    def request_unsubscribe(self, unsubscribe_url, sender=''):
+        """GET Request an Unsubscribe-URL"""
+        return self.try_unsubscribe(unsubscribe_url, sender)[0]
+    
+    def try_unsubscribe(self, unsubscribe_url, sender=''):
+        """Unsubscribe mit Outcome-Cache - liefert (Erfolg, Meldung)"""
+        # Gleiche Liste, anderes Token: kein Request, Emails dürfen trotzdem weg
+        if self.unsubscribe_cache.sender_unsubscribed(unsubscribe_url, sender):
+            return True, 'Bereits abgemeldet'
+        
+        cached = self.unsubscribe_cache.lookup(unsubscribe_url)
+        if cached is not None:
+            if cached:
+                return True, 'Erfolgreich abgemeldet'
+            return False, 'Übersprungen: kürzlich fehlgeschlagen oder Host nicht erreichbar'
+        
+        try:
+            response = requests.get(unsubscribe_url, timeout=10, allow_redirects=True)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            self.unsubscribe_cache.record_failure(unsubscribe_url, host_error=True)
+            return False, f'HTTP-Fehler: {str(e)}'
+        except Exception as e:
+            self.unsubscribe_cache.record_failure(unsubscribe_url)
+            return False, f'HTTP-Fehler: {str(e)}'
+        
+        if response.status_code == 200:
+            self.unsubscribe_cache.record_success(unsubscribe_url, sender)
+            return True, 'Erfolgreich abgemeldet'
+        
+        self.unsubscribe_cache.record_failure(unsubscribe_url)
+        return False, f'Unsubscribe fehlgeschlagen (Status {response.status_code})'
+    
     def unsubscribe_from_newsletter(self, email_id):
         """Von Newsletter abmelden"""
         try:
@@ -96,38 +176,23 @@ class GmailAPI:
                 return {'success': False, 'error': 'Email nicht gefunden'}
             
             # List-Unsubscribe Header prüfen
-            list_unsubscribe = email_details['headers'].get('list-unsubscribe', '')
-            unsubscribe_url = None
-            
-            if list_unsubscribe:
-                # URL aus Header extrahieren
-                import re
-                url_match = re.search(r'<(https?://[^>]+)>', list_unsubscribe)
-                if url_match:
-                    unsubscribe_url = url_match.group(1)
+            unsubscribe_url = self.find_unsubscribe_url(email_details)
             
             if unsubscribe_url:
-                # HTTP Request an Unsubscribe-URL
-                try:
-                    response = requests.get(unsubscribe_url, timeout=10, allow_redirects=True)
-                    if response.status_code == 200:
-                        # Email auch löschen nach erfolgreichem Unsubscribe
-                        self.delete_email(email_id)
-                        return {
-                            'success': True, 
-                            'message': 'Erfolgreich abgemeldet',
-                            'url': unsubscribe_url
-                        }
-                    else:
-                        return {
-                            'success': False, 
-                            'error': f'Unsubscribe fehlgeschlagen (Status {response.status_code})',
-                            'url': unsubscribe_url
-                        }
-                except Exception as e:
+                # HTTP Request an Unsubscribe-URL (bzw. Ergebnis aus dem Cache)
+                success, message = self.try_unsubscribe(unsubscribe_url, email_details['from'])
+                if success:
+                    # Email auch löschen nach erfolgreichem Unsubscribe
+                    self.delete_email(email_id)
+                    return {
+                        'success': True, 
+                        'message': message,
+                        'url': unsubscribe_url
+                    }
+                else:
                     return {
                         'success': False, 
-                        'error': f'HTTP-Fehler: {str(e)}',
+                        'error': message,
                         'url': unsubscribe_url
                     }
             else:
@@ -141,48 +206,46 @@ class GmailAPI:
                 
         except Exception as e:
             return {'success': False, 'error': str(e)}
-    
-    def create_cleanup_label(self, label_name="🤖 Email-Cleaner"):
-        """Label für verarbeitete Emails erstellen"""
-        try:
-            label_object = {
-                'name': label_name,
-                'messageListVisibility': 'show',
-                'labelListVisibility': 'labelShow'
-            }
-            
-            label = self.service.users().labels().create(
-                userId='me', 
-                body=label_object
-            ).execute()
-            
-            return label['id']
-            
-        except HttpError as error:
-            if 'Label name exists' in str(error):
-                # Label existiert bereits
-                labels = self.service.users().labels().list(userId='me').execute()
-                for label in labels['labels']:
-                    if label['name'] == label_name:
-                        return label['id']
-            return None
-    
-    def add_label_to_email(self, email_id, label_id):
-        """Label zu Email hinzufügen"""
-        try:
-            self.service.users().messages().modify(
-                userId='me',
-                id=email_id,
-                body={'addLabelIds': [label_id]}
-            ).execute()
-            return True
-        except HttpError as error:
-            print(f"❌ Error adding label: {error}")
-            return False
 
 # Gmail API Instanz
 gmail = GmailAPI()
 
+# Profiling per Request: Header "X-Profile: 1" oder Query-Parameter "?profile=1"
+def profiling_requested():
+    flag = request.headers.get('X-Profile') or request.args.get('profile', '')
+    return flag.lower() in ('1', 'true', 'yes')
+
+@app.before_request
+def start_profiling():
+    if profiling_requested():
+        g.profiler = Profiler(enabled=True, run_name='api')
+        g.profile = g.profiler.start()
+        g.profile_started = time.perf_counter()
+
+@app.after_request
+def stop_profiling(response):
+    if 'profile' not in g:
+        return response
+    
+    if g.profile is None:
+        # Anderer Request wird gerade profiliert - dieser läuft ohne Profil
+        response.headers['X-Profile-Skipped'] = 'another profile is active'
+        return response
+    
+    data = request.get_json(silent=True) or {}
+    tags = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'messages': (len(data.get('email_ids', [])) or len(data.get('thread_ids', []))
+                     or len(data.get('newsletters', []))
+                     or int('email_id' in (request.view_args or {})))
+    }
+    path = g.profiler.stop(g.profile, request.endpoint or 'request',
+                           time.perf_counter() - g.profile_started, tags)
+    response.headers['X-Profile-File'] = path
+    return response
+
 # API Endpoints
 
 @app.route('/api/health', methods=['GET'])
@@ -212,6 +275,7 @@ def unsubscribe_email(email_id):
     """Von Newsletter abmelden"""
     try:
         result = gmail.unsubscribe_from_newsletter(email_id)
+        gmail.unsubscribe_cache.save()
         return jsonify(result)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -222,24 +286,30 @@ def bulk_delete():
     try:
         data = request.get_json()
         email_ids = data.get('email_ids', [])
+        thread_ids = data.get('thread_ids', [])
         
-        if not email_ids:
+        if not email_ids and not thread_ids:
             return jsonify({'success': False, 'error': 'Keine Email-IDs angegeben'}), 400
         
-        results = []
-        success_count = 0
+        if thread_ids:
+            return bulk_delete_threads(thread_ids, data.get('dry_run'))
         
+        # Alle Löschungen als ein Plan - ein batchModify statt einem Call pro Email
+        plan = CleanupPlan()
         for email_id in email_ids:
-            success = gmail.delete_email(email_id)
-            results.append({
-                'email_id': email_id,
-                'success': success
-            })
-            if success:
-                success_count += 1
-            
-            # Rate limiting
-            time.sleep(0.1)
+            plan.add_message(email_id, trash=True)
+        
+        if data.get('dry_run'):
+            return jsonify({'success': True, 'dry_run': True, 'plan': plan.to_dict()})
+        
+        outcome = plan.execute(gmail.service, gmail.request_unsubscribe)
+        trashed = set(outcome['trashed'])
+        
+        results = [
+            {'email_id': email_id, 'success': email_id in trashed}
+            for email_id in email_ids
+        ]
+        success_count = len(trashed)
         
         return jsonify({
             'success': True,
@@ -251,43 +321,138 @@ def bulk_delete():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def bulk_delete_threads(thread_ids, dry_run=False):
+    """Ganze Threads löschen - alle Nachrichten landen im selben Plan wie Einzel-Emails"""
+    plan = CleanupPlan()
+    message_ids = {}
+    
+    for thread_id in thread_ids:
+        thread_details = gmail.get_thread_details(thread_id)
+        if not thread_details:
+            continue
+        message_ids[thread_id] = thread_details['message_ids']
+        for message_id in message_ids[thread_id]:
+            plan.add_message(message_id, trash=True)
+    
+    if dry_run:
+        return jsonify({'success': True, 'dry_run': True, 'plan': plan.to_dict()})
+    
+    outcome = plan.execute(gmail.service, gmail.request_unsubscribe)
+    trashed = set(outcome['trashed'])
+    
+    results = []
+    success_count = 0
+    
+    for thread_id in thread_ids:
+        if thread_id not in message_ids:
+            results.append({'thread_id': thread_id, 'success': False, 'error': 'Thread nicht gefunden'})
+            continue
+        
+        success = all(message_id in trashed for message_id in message_ids[thread_id])
+        results.append({
+            'thread_id': thread_id,
+            'success': success
+        })
+        if success:
+            success_count += 1
+    
+    return jsonify({
+        'success': True,
+        'total_processed': len(thread_ids),
+        'successful_deletions': success_count,
+        'results': results
+    })
+
 @app.route('/api/bulk-unsubscribe', methods=['POST'])
 def bulk_unsubscribe():
     """Von mehreren Newslettern abmelden"""
     try:
         data = request.get_json()
         email_ids = data.get('email_ids', [])
+        thread_ids = data.get('thread_ids', [])
         
-        if not email_ids:
+        if not email_ids and not thread_ids:
             return jsonify({'success': False, 'error': 'Keine Email-IDs angegeben'}), 400
         
+        # Thread-Modus: ganze Konversationen, klassifiziert über die neueste Nachricht
+        by_thread = bool(thread_ids)
+        item_ids = thread_ids if by_thread else email_ids
+        id_key = 'thread_id' if by_thread else 'email_id'
+        get_details = gmail.get_thread_details if by_thread else gmail.get_email_details
+        
+        # Plan kompilieren: Unsubscribe pro URL nur einmal, Label + Trash zusammengefasst
+        plan = CleanupPlan(label_name="🤖 Email-Cleaner")
+        urls = {}
+        message_ids = {}
+        
+        for item_id in item_ids:
+            email_details = get_details(item_id)
+            if not email_details:
+                continue
+            
+            url = gmail.find_unsubscribe_url(email_details)
+            urls[item_id] = url
+            message_ids[item_id] = email_details.get('message_ids', [item_id])
+            if url:
+                plan.add_unsubscribe(url, item_id, email_details['from'])
+            
+            # Label + Löschen nur nach erfolgreichem Unsubscribe (ohne Link: nur löschen)
+            for message_id in message_ids[item_id]:
+                plan.add_message(message_id, label=True, trash=True, requires_unsubscribe=url or "")
+        
+        if data.get('dry_run'):
+            return jsonify({'success': True, 'dry_run': True, 'plan': plan.to_dict()})
+        
+        # Meldung pro URL merken (z.B. "Bereits abgemeldet" bei gleicher Liste)
+        unsubscribe_messages = {}
+        def unsubscribe(url, sender):
+            success, unsubscribe_messages[url] = gmail.try_unsubscribe(url, sender)
+            return success
+        
+        outcome = plan.execute(gmail.service, unsubscribe, gmail.label_cache)
+        gmail.unsubscribe_cache.save()
+        trashed = set(outcome['trashed'])
+        
         results = []
         success_count = 0
         
-        # Cleanup-Label erstellen
-        label_id = gmail.create_cleanup_label()
-        
-        for email_id in email_ids:
-            result = gmail.unsubscribe_from_newsletter(email_id)
+        for item_id in item_ids:
+            if item_id not in urls:
+                result = {'success': False, 'error': 'Email nicht gefunden'}
+                results.append({id_key: item_id, **result})
+                continue
             
-            # Label hinzufügen falls erfolgreich
-            if result['success'] and label_id:
-                gmail.add_label_to_email(email_id, label_id)
+            deleted = all(message_id in trashed for message_id in message_ids[item_id])
+            if urls[item_id] and not outcome['unsubscribe_results'][urls[item_id]]:
+                result = {
+                    'success': False,
+                    'error': unsubscribe_messages.get(urls[item_id], 'Unsubscribe fehlgeschlagen'),
+                    'url': urls[item_id]
+                }
+            elif urls[item_id]:
+                result = {
+                    'success': deleted,
+                    'message': unsubscribe_messages.get(urls[item_id], 'Erfolgreich abgemeldet'),
+                    'url': urls[item_id]
+                }
+            else:
+                result = {
+                    'success': deleted,
+                    'message': 'Kein Unsubscribe-Link gefunden, Email gelöscht' if deleted else 'Fehler beim Löschen',
+                    'url': None
+                }
             
             results.append({
-                'email_id': email_id,
+                id_key: item_id,
                 **result
             })
             
             if result['success']:
                 success_count += 1
-            
-            # Rate limiting - wichtig für Gmail API
-            time.sleep(1)
         
         return jsonify({
             'success': True,
-            'total_processed': len(email_ids),
+            'total_processed': len(item_ids),
             'successful_unsubscribes': success_count,
             'results': results
         })
@@ -9,6 +9,7 @@ import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
 import json
+import argparse
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -18,8 +19,13 @@ from googleapiclient.errors import HttpError
 from bs4 import BeautifulSoup
 import requests
 
+from cleanup_plan import CleanupPlan, LabelCache
+from snapshot import write_snapshot
+from unsubscribe_cache import UnsubscribeCache
+from profiling import Profiler
+
 class EmailCleaner:
-    def __init__(self):
+    def __init__(self, profiler: Profiler = None, offline: bool = False):
         # Gmail API Scopes - was wir alles dürfen
         self.SCOPES = [
             'https://www.googleapis.com/auth/gmail.readonly',
@@ -28,10 +34,16 @@ class EmailCleaner:
         ]
         
         self.service = None
+        self.label_cache = None
+        # Offline (mbox-Worker) nur Erkennung - kein Cache von Platte, kein Profiler
+        self.unsubscribe_cache = None if offline else UnsubscribeCache()
+        self.profiler = None if offline else profiler or Profiler(enabled=False)
+        self.verbose = not offline  # Newsletter-Treffer einzeln ausgeben
         self.stats = {
             'emails_processed': 0,
             'newsletters_found': 0,
             'unsubscribed': 0,
+            'already_unsubscribed': 0,
             'deleted': 0,
             'space_freed_mb': 0
         }
@@ -75,6 +87,7 @@ class EmailCleaner:
                 pickle.dump(creds, token)
         
         self.service = build('gmail', 'v1', credentials=creds)
+        self.label_cache = LabelCache(self.service)
         print("✅ Gmail API erfolgreich verbunden")
         return True
     
@@ -133,6 +146,64 @@ class EmailCleaner:
             print(f"❌ Fehler beim Abrufen der Email-Details: {error}")
             return {}
     
+    def get_threads(self, query: str = "", max_results: int = 100) -> List[Dict]:
+        """Threads (Konversationen) mit bestimmter Query abrufen"""
+        try:
+            results = self.service.users().threads().list(
+                userId='me',
+                q=query,
+                maxResults=max_results
+            ).execute()
+            
+            threads = results.get('threads', [])
+            print(f"🧵 {len(threads)} Threads gefunden mit Query: '{query}'")
+            
+            return threads
+            
+        except HttpError as error:
+            print(f"❌ Fehler beim Abrufen der Threads: {error}")
+            return []
+    
+    def get_thread_details(self, thread_id: str) -> Dict:
+        """Thread über die Metadaten seiner neuesten Nachricht beschreiben, Größe über alle Nachrichten"""
+        try:
+            thread = self.service.users().threads().get(
+                userId='me',
+                id=thread_id,
+                format='metadata',
+                metadataHeaders=['From', 'To', 'Subject', 'Date', 'List-Unsubscribe']
+            ).execute()
+            
+            messages = thread.get('messages', [])
+            if not messages:
+                return {}
+            newest = max(messages, key=lambda m: int(m.get('internalDate', 0)))
+            
+            # Headers der neuesten Nachricht extrahieren
+            headers = {}
+            for header in newest['payload'].get('headers', []):
+                headers[header['name'].lower()] = header['value']
+            
+            # Größe über den ganzen Thread aufsummieren
+            size_mb = sum(int(m.get('sizeEstimate', 0)) for m in messages) / (1024 * 1024)
+            
+            return {
+                'id': thread_id,
+                'subject': headers.get('subject', 'Kein Betreff'),
+                'from': headers.get('from', 'Unbekannt'),
+                'to': headers.get('to', ''),
+                'date': headers.get('date', ''),
+                'body': '',  # Metadaten-Format liefert keinen Body
+                'size_mb': size_mb,
+                'headers': headers,
+                'labels': newest.get('labelIds', []),
+                'message_ids': [m['id'] for m in messages]
+            }
+            
+        except HttpError as error:
+            print(f"❌ Fehler beim Abrufen der Thread-Details: {error}")
+            return {}
+    
     def extract_email_body(self, payload) -> str:
         """Email-Body aus Payload extrahieren"""
         body = ""
@@ -191,7 +262,7 @@ class EmailCleaner:
         # Newsletter wenn mindestens 2 Kriterien erfüllt
         is_newsletter = len(checks) >= 2
         
-        if is_newsletter:
+        if is_newsletter and self.verbose:
             print(f"📰 Newsletter erkannt: {email_details['subject'][:50]}...")
             print(f"   Kriterien: {[check[0] for check in checks]}")
         
@@ -224,114 +295,99 @@ class EmailCleaner:
         
         return ""
     
-    def unsubscribe_safely(self, unsubscribe_url: str) -> bool:
-        """Sicher von Newsletter abmelden"""
+    def unsubscribe_safely(self, unsubscribe_url: str, sender: str = "") -> bool:
+        """Sicher von Newsletter abmelden (bekannte Ergebnisse kommen aus dem Cache)"""
         if not unsubscribe_url:
             return False
         
+        # Absender schon über eine andere URL desselben Hosts abgemeldet - kein Request,
+        # aber die Emails dürfen trotzdem aufgeräumt werden
+        if self.unsubscribe_cache.sender_unsubscribed(unsubscribe_url, sender):
+            print(f"✅ Bereits abgemeldet ({sender}): {unsubscribe_url}")
+            self.stats['already_unsubscribed'] += 1
+            return True
+        
+        # URL bereits abgemeldet, kürzlich fehlgeschlagen oder Host nicht erreichbar?
+        cached = self.unsubscribe_cache.lookup(unsubscribe_url)
+        if cached is not None:
+            print(f"{'✅' if cached else '⏭️ '} Unsubscribe aus Cache ({'erfolgreich' if cached else 'übersprungen'}): {unsubscribe_url}")
+            self.stats['unsubscribed'] += int(cached)
+            return cached
+        
         try:
             # Erst mal nur GET Request zum Testen
             response = requests.get(unsubscribe_url, timeout=10, allow_redirects=True)
             
             if response.status_code == 200:
                 print(f"✅ Unsubscribe erfolgreich: {unsubscribe_url}")
+                self.unsubscribe_cache.record_success(unsubscribe_url, sender)
+                self.stats['unsubscribed'] += 1
                 return True
             else:
                 print(f"⚠️  Unsubscribe fehlgeschlagen (Status {response.status_code}): {unsubscribe_url}")
+                self.unsubscribe_cache.record_failure(unsubscribe_url)
                 return False
                 
+        except (requests.ConnectionError, requests.Timeout) as e:
+            print(f"❌ Host nicht erreichbar beim Unsubscribe: {e}")
+            self.unsubscribe_cache.record_failure(unsubscribe_url, host_error=True)
+            return False
         except Exception as e:
             print(f"❌ Fehler beim Unsubscribe: {e}")
+            self.unsubscribe_cache.record_failure(unsubscribe_url)
             return False
     
-    def delete_email(self, email_id: str) -> bool:
-        """Email löschen (in Trash verschieben)"""
-        try:
-            self.service.users().messages().trash(userId='me', id=email_id).execute()
-            print(f"🗑️  Email gelöscht: {email_id}")
-            return True
-        except HttpError as error:
-            print(f"❌ Fehler beim Löschen: {error}")
-            return False
-    
-    def create_label(self, label_name: str) -> str:
-        """Gmail Label erstellen"""
-        try:
-            label_object = {
-                'name': label_name,
-                'messageListVisibility': 'show',
-                'labelListVisibility': 'labelShow'
-            }
-            
-            label = self.service.users().labels().create(
-                userId='me', 
-                body=label_object
-            ).execute()
-            
-            print(f"🏷️  Label erstellt: {label_name}")
-            return label['id']
-            
-        except HttpError as error:
-            if 'Label name exists' in str(error):
-                # Label existiert bereits
-                labels = self.service.users().labels().list(userId='me').execute()
-                for label in labels['labels']:
-                    if label['name'] == label_name:
-                        return label['id']
-            print(f"❌ Fehler beim Label erstellen: {error}")
-            return ""
-    
-    def add_label_to_email(self, email_id: str, label_id: str):
-        """Label zu Email hinzufügen"""
-        try:
-            self.service.users().messages().modify(
-                userId='me',
-                id=email_id,
-                body={'addLabelIds': [label_id]}
-            ).execute()
-        except HttpError as error:
-            print(f"❌ Fehler beim Label hinzufügen: {error}")
-    
-    def analyze_inbox(self, days_back: int = 30) -> Dict:
-        """Inbox analysieren und Report erstellen"""
+    def analyze_inbox(self, days_back: int = 30, by_thread: bool = False) -> Dict:
+        """Inbox analysieren und Report erstellen (optional pro Thread statt pro Email)"""
         print(f"🔍 Analysiere Inbox der letzten {days_back} Tage...")
         
         # Query für letzte X Tage
         date_query = f"newer_than:{days_back}d"
         
-        # Alle Emails abrufen
-        emails = self.get_emails(query=date_query, max_results=500)
+        # Alle Emails bzw. Threads abrufen
+        if by_thread:
+            emails = self.get_threads(query=date_query, max_results=500)
+            get_details = self.get_thread_details
+        else:
+            emails = self.get_emails(query=date_query, max_results=500)
+            get_details = self.get_email_details
         
         analysis = {
-            'total_emails': len(emails),
+            'total_emails': 0 if by_thread else len(emails),
+            'granularity': 'thread' if by_thread else 'message',
             'newsletters': [],
             'large_emails': [],
             'old_emails': [],
             'total_size_mb': 0
         }
         
-        print(f"📊 Verarbeite {len(emails)} Emails...")
+        print(f"📊 Verarbeite {len(emails)} {'Threads' if by_thread else 'Emails'}...")
         
         for i, email in enumerate(emails):
             if i % 50 == 0:
                 print(f"   Progress: {i}/{len(emails)}")
             
-            details = self.get_email_details(email['id'])
+            details = get_details(email['id'])
             if not details:
                 continue
             
             analysis['total_size_mb'] += details['size_mb']
+            if by_thread:
+                analysis['total_emails'] += len(details['message_ids'])
             
             # Newsletter prüfen
             if self.is_newsletter(details):
                 unsubscribe_link = self.find_unsubscribe_link(details)
-                analysis['newsletters'].append({
+                newsletter = {
                     'id': details['id'],
                     'from': details['from'],
                     'subject': details['subject'],
                     'unsubscribe_link': unsubscribe_link,
                     'size_mb': details['size_mb']
-                })
+                }
+                if by_thread:
+                    newsletter['message_ids'] = details['message_ids']
+                analysis['newsletters'].append(newsletter)
             
             # Große Emails (>5MB)
             if details['size_mb'] > 5:
@@ -347,15 +403,21 @@ class EmailCleaner:
         
         return analysis
     
-    def clean_inbox(self, auto_unsubscribe: bool = False, auto_delete: bool = False):
+    def clean_inbox(self, auto_unsubscribe: bool = False, auto_delete: bool = False,
+                    dry_run: bool = False, by_thread: bool = False):
         """Hauptfunktion: Inbox aufräumen"""
         print("🧹 Email Cleaner gestartet!")
         
-        if not self.authenticate_gmail():
-            return
+        with self.profiler.stage('authenticate'):
+            if not self.authenticate_gmail():
+                return
         
         # Inbox analysieren
-        analysis = self.analyze_inbox(days_back=30)
+        with self.profiler.stage('analyze') as tags:
+            analysis = self.analyze_inbox(days_back=30, by_thread=by_thread)
+            tags['messages'] = analysis['total_emails']
+            tags['newsletters'] = len(analysis['newsletters'])
+            tags['granularity'] = analysis['granularity']
         
         print(f"\n📊 ANALYSIS REPORT:")
         print(f"   📧 Emails insgesamt: {analysis['total_emails']}")
@@ -363,51 +425,77 @@ class EmailCleaner:
         print(f"   💾 Große Emails (>5MB): {len(analysis['large_emails'])}")
         print(f"   📏 Gesamtgröße: {analysis['total_size_mb']:.2f} MB")
         
-        # Newsletter Label erstellen
-        newsletter_label_id = self.create_label("🤖 Auto-Newsletter")
-        
-        # Newsletter verarbeiten
-        if analysis['newsletters']:
-            print(f"\n📰 Verarbeite {len(analysis['newsletters'])} Newsletter...")
+        # Cleanup-Plan erstellen und zur Prüfung exportieren
+        with self.profiler.stage('plan', messages=len(analysis['newsletters'])):
+            plan = CleanupPlan.from_analysis(
+                analysis,
+                label_name="🤖 Auto-Newsletter",
+                auto_unsubscribe=auto_unsubscribe,
+                auto_delete=auto_delete
+            )
+            plan.save('cleanup_plan.json')
+            summary = plan.to_dict()['summary']
+        
+        print(f"\n📋 CLEANUP-PLAN:")
+        print(f"   🏷️  Labeln: {summary['to_label']}")
+        print(f"   🚫 Unsubscribe-URLs (dedupliziert): {summary['unsubscribe_urls']}")
+        print(f"   🗑️  Löschen: {summary['to_trash']}")
+        print(f"   📡 Gmail-Calls (geschätzt): {summary['estimated_gmail_calls']}")
+        print("📁 Plan in cleanup_plan.json gespeichert")
+        
+        self.stats['newsletters_found'] = len(analysis['newsletters'])
+        
+        if dry_run:
+            print("\n🔍 Dry Run - keine Änderungen durchgeführt")
+        elif plan.messages:
+            print(f"\n📰 Führe Plan für {len(plan.messages)} Emails aus...")
+            with self.profiler.stage('execute', messages=len(plan.messages),
+                                     unsubscribe_urls=len(plan.unsubscribes)):
+                result = plan.execute(self.service, self.unsubscribe_safely, self.label_cache)
+            # Cache-Änderungen des ganzen Laufs auf einmal schreiben
+            self.unsubscribe_cache.save()
             
-            for newsletter in analysis['newsletters']:
-                print(f"\n--- {newsletter['subject'][:50]}... ---")
-                print(f"Von: {newsletter['from']}")
-                
-                # Label hinzufügen
-                if newsletter_label_id:
-                    self.add_label_to_email(newsletter['id'], newsletter_label_id)
-                
-                # Unsubscribe versuchen
-                if auto_unsubscribe and newsletter['unsubscribe_link']:
-                    if self.unsubscribe_safely(newsletter['unsubscribe_link']):
-                        self.stats['unsubscribed'] += 1
-                
-                # Löschen
-                if auto_delete:
-                    if self.delete_email(newsletter['id']):
-                        self.stats['deleted'] += 1
-                        self.stats['space_freed_mb'] += newsletter['size_mb']
-                
-                self.stats['newsletters_found'] += 1
-                time.sleep(1)  # Rate limiting
+            self.stats['deleted'] += len(result['trashed'])
+            self.stats['space_freed_mb'] += result['space_freed_mb']
+            
+            if result['failed']:
+                print(f"⚠️  {len(result['failed'])} Emails konnten nicht bearbeitet werden")
         
         # Abschlussbericht
         print(f"\n✅ EMAIL CLEANER FERTIG!")
         print(f"   📰 Newsletter gefunden: {self.stats['newsletters_found']}")
         print(f"   🚫 Abgemeldet: {self.stats['unsubscribed']}")
+        print(f"   ✅ Bereits abgemeldet: {self.stats['already_unsubscribed']}")
         print(f"   🗑️  Gelöscht: {self.stats['deleted']}")
         print(f"   💾 Speicher befreit: {self.stats['space_freed_mb']:.2f} MB")
         
-        # Analysis als JSON speichern
-        with open('email_analysis.json', 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, ensure_ascii=False, indent=2)
-        
-        print("📁 Detailanalyse in email_analysis.json gespeichert")
+        with self.profiler.stage('save', messages=analysis['total_emails']):
+            # Analysis als JSON speichern
+            with open('email_analysis.json', 'w', encoding='utf-8') as f:
+                json.dump(analysis, f, ensure_ascii=False, indent=2)
+            
+            print("📁 Detailanalyse in email_analysis.json gespeichert")
+            
+            # Kompakter Snapshot für Verlauf und Run-to-Run Diffs
+            snapshot_path = write_snapshot(analysis)
+            print(f"📁 Snapshot in {snapshot_path} gespeichert")
 
 # Verwendung
 if __name__ == "__main__":
-    cleaner = EmailCleaner()
+    parser = argparse.ArgumentParser(description="Smart Email Cleaner")
+    parser.add_argument('--profile', action='store_true',
+                        help="Jede Stage mit cProfile mitschneiden (.prof + .json)")
+    parser.add_argument('--profile-dir', default='profiles',
+                        help="Zielverzeichnis für Profile (Standard: profiles)")
+    parser.add_argument('--threads', action='store_true',
+                        help="Pro Thread statt pro Email analysieren und aufräumen")
+    args = parser.parse_args()
+    
+    cleaner = EmailCleaner(profiler=Profiler(
+        enabled=args.profile,
+        output_dir=args.profile_dir,
+        run_name='clean_inbox'
+    ))
     
     print("🤖 Smart Email Cleaner")
     print("=" * 50)
@@ -417,18 +505,22 @@ if __name__ == "__main__":
     print("2. Analysieren + Labeln")
     print("3. Analysieren + Labeln + Unsubscribe")
     print("4. FULL CLEAN (Analysieren + Unsubscribe + Löschen)")
+    print("5. Dry Run (FULL CLEAN nur planen, Plan exportieren)")
     
-    mode = input("\nModus wählen (1-4): ").strip()
+    mode = input("\nModus wählen (1-5): ").strip()
     
     if mode == "1":
-        cleaner.clean_inbox(auto_unsubscribe=False, auto_delete=False)
+        cleaner.clean_inbox(auto_unsubscribe=False, auto_delete=False, by_thread=args.threads)
     elif mode == "2":
-        cleaner.clean_inbox(auto_unsubscribe=False, auto_delete=False)
+        cleaner.clean_inbox(auto_unsubscribe=False, auto_delete=False, by_thread=args.threads)
     elif mode == "3":
-        cleaner.clean_inbox(auto_unsubscribe=True, auto_delete=False)
+        cleaner.clean_inbox(auto_unsubscribe=True, auto_delete=False, by_thread=args.threads)
     elif mode == "4":
         confirm = input("⚠️  WARNUNG: Emails werden gelöscht! Fortfahren? (yes/no): ")
         if confirm.lower() == "yes":
-            cleaner.clean_inbox(auto_unsubscribe=True, auto_delete=True)
+            cleaner.clean_inbox(auto_unsubscribe=True, auto_delete=True, by_thread=args.threads)
+    elif mode == "5":
+        cleaner.clean_inbox(auto_unsubscribe=True, auto_delete=True, dry_run=True,
+                            by_thread=args.threads)
     else:
         print("❌ Ungültiger Modus")
\ No newline at end of file
@@ -0,0 +1,253 @@
+# Offline-Analyse - Google Takeout .mbox ohne Gmail API auswerten
+# Die Datei wird per mmap gelesen und an den "From "-Trennzeilen in Byte-Bereiche
+# zerlegt. Worker-Prozesse öffnen dieselbe Datei selbst und bekommen nur Offsets,
+# parsen die Nachrichten und wenden dieselbe Erkennung wie analyze_inbox an.
+# Zuerst werden nur die Header gelesen - Nachrichten außerhalb von --days kosten
+# weder Body-Kopie noch MIME-/HTML-Parsing.
+# Ergebnis ist eine normale email_analysis.json für das Dashboard.
+
+import os
+import json
+import mmap
+import time
+import argparse
+from email import policy
+from email.parser import BytesParser
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timedelta, timezone
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from email_cleaner import EmailCleaner
+
+BATCH_SIZE = 256           # Nachrichten pro Worker-Aufgabe
+LARGE_EMAIL_MB = 5         # wie analyze_inbox
+SEPARATOR = b'\nFrom '
+
+# Zustand pro Worker-Prozess (wird in _init_worker gesetzt)
+_worker = {}
+
+
+def iter_message_spans(mm) -> Iterator[Tuple[int, int]]:
+    """Byte-Bereiche (start, end) aller Nachrichten im mbox, ohne Daten zu kopieren"""
+    if mm[:5] == b'From ':
+        start = 0
+    else:
+        start = mm.find(SEPARATOR)
+        if start == -1:
+            return
+        start += 1
+
+    size = len(mm)
+    while start < size:
+        separator = mm.find(SEPARATOR, start)
+        end = size if separator == -1 else separator + 1
+        yield start, end
+        start = end
+
+
+def iter_batches(mm, batch_size: int = BATCH_SIZE) -> Iterator[List[Tuple[int, int]]]:
+    """Nachrichten-Bereiche in Batches für die Worker bündeln"""
+    batch = []
+    for span in iter_message_spans(mm):
+        batch.append(span)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _init_worker(path: str, cutoff: Optional[float]):
+    """Pro Worker einmal: mbox mappen, Parser und EmailCleaner anlegen"""
+    mbox_file = open(path, 'rb')
+    _worker.update(
+        file=mbox_file,
+        mmap=mmap.mmap(mbox_file.fileno(), 0, access=mmap.ACCESS_READ),
+        parser=BytesParser(policy=policy.default),
+        cleaner=EmailCleaner(offline=True),
+        cutoff=cutoff
+    )
+
+
+def extract_body(message) -> str:
+    """Text-Body extrahieren (text/plain bevorzugt, sonst HTML als Text)"""
+    part = message.get_body(preferencelist=('plain', 'html'))
+    if part is None:
+        return ""
+
+    try:
+        content = part.get_content()
+    except Exception:
+        payload = part.get_payload(decode=True) or b''
+        content = payload.decode('utf-8', errors='replace')
+
+    if part.get_content_type() == 'text/html':
+        content = BeautifulSoup(content, 'html.parser').get_text()
+    return content
+
+
+def parse_message(mm, start: int, end: int, cutoff: Optional[float] = None) -> Optional[Dict]:
+    """mbox-Nachricht in das Format von get_email_details bringen (None = vor dem Stichtag)"""
+    # "From "-Envelope-Zeile überspringen
+    start = mm.find(b'\n', start, end) + 1 or end
+
+    # Nur den Header-Block kopieren und parsen, Stichtag prüfen
+    header_end = mm.find(b'\n\n', start, end)
+    if header_end == -1:
+        header_end = mm.find(b'\n\r\n', start, end)  # CRLF-Zeilenenden
+    header_end = end if header_end == -1 else header_end + 1
+    header_message = _worker['parser'].parsebytes(mm[start:header_end], headersonly=True)
+
+    headers = {}
+    for name, value in header_message.items():
+        headers[name.lower()] = str(value)
+
+    if _is_older_than_cutoff(headers.get('date', ''), cutoff):
+        return None
+
+    # Erst jetzt die ganze Nachricht inkl. Body
+    raw = mm[start:end]
+    message = _worker['parser'].parsebytes(raw)
+
+    return {
+        'id': headers.get('message-id', '').strip('<>') or f"mbox-{start}",
+        'subject': headers.get('subject', 'Kein Betreff'),
+        'from': headers.get('from', 'Unbekannt'),
+        'to': headers.get('to', ''),
+        'date': headers.get('date', ''),
+        'body': extract_body(message),
+        'size_mb': len(raw) / (1024 * 1024),
+        'headers': headers,
+        'labels': [label.strip() for label in headers.get('x-gmail-labels', '').split(',') if label.strip()]
+    }
+
+
+def _is_older_than_cutoff(date_header: str, cutoff: Optional[float]) -> bool:
+    """Nachricht vor dem Stichtag? (ohne lesbares Datum: nicht filtern)"""
+    if cutoff is None or not date_header:
+        return False
+    try:
+        date = parsedate_to_datetime(date_header)
+    except (TypeError, ValueError):
+        return False
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp() < cutoff
+
+
+def _analyze_batch(spans: List[Tuple[int, int]]) -> Dict:
+    """Ein Batch im Worker: parsen, Newsletter + große Emails erkennen"""
+    mm = _worker['mmap']
+    cleaner = _worker['cleaner']
+    partial = {'total_emails': 0, 'total_size_mb': 0, 'newsletters': [], 'large_emails': [], 'errors': 0}
+
+    for start, end in spans:
+        try:
+            details = parse_message(mm, start, end, _worker['cutoff'])
+        except Exception:
+            partial['errors'] += 1
+            continue
+
+        if details is None:
+            continue
+
+        partial['total_emails'] += 1
+        partial['total_size_mb'] += details['size_mb']
+
+        # Newsletter prüfen - identisch zu analyze_inbox
+        if cleaner.is_newsletter(details):
+            partial['newsletters'].append({
+                'id': details['id'],
+                'from': details['from'],
+                'subject': details['subject'],
+                'unsubscribe_link': cleaner.find_unsubscribe_link(details),
+                'size_mb': details['size_mb']
+            })
+
+        # Große Emails (>5MB)
+        if details['size_mb'] > LARGE_EMAIL_MB:
+            partial['large_emails'].append({
+                'id': details['id'],
+                'from': details['from'],
+                'subject': details['subject'],
+                'size_mb': details['size_mb']
+            })
+
+    return partial
+
+
+def analyze_mbox(path: str, workers: Optional[int] = None, days_back: Optional[int] = None,
+                 batch_size: int = BATCH_SIZE) -> Dict:
+    """mbox-Datei parallel analysieren - Ergebnis im Format von analyze_inbox"""
+    print(f"🔍 Analysiere {path} offline...")
+
+    analysis = {
+        'total_emails': 0,
+        'source': 'mbox',
+        'newsletters': [],
+        'large_emails': [],
+        'old_emails': [],
+        'total_size_mb': 0
+    }
+
+    if os.path.getsize(path) == 0:
+        print("⚠️  Leere mbox-Datei")
+        return analysis
+
+    cutoff = None
+    if days_back:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days_back)).timestamp()
+
+    started = time.perf_counter()
+    errors = 0
+
+    with open(path, 'rb') as mbox_file, \
+            mmap.mmap(mbox_file.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+            Pool(workers, initializer=_init_worker, initargs=(path, cutoff)) as pool:
+
+        # imap statt map: Splitter und Worker laufen gleichzeitig, Reihenfolge bleibt erhalten
+        for i, partial in enumerate(pool.imap(_analyze_batch, iter_batches(mm, batch_size))):
+            analysis['total_emails'] += partial['total_emails']
+            analysis['total_size_mb'] += partial['total_size_mb']
+            analysis['newsletters'].extend(partial['newsletters'])
+            analysis['large_emails'].extend(partial['large_emails'])
+            errors += partial['errors']
+
+            if i % 40 == 0:
+                print(f"   Progress: {analysis['total_emails']} Emails")
+
+    duration = time.perf_counter() - started
+    print(f"📊 {analysis['total_emails']} Emails in {duration:.1f}s analysiert")
+    if errors:
+        print(f"⚠️  {errors} Nachrichten konnten nicht geparst werden")
+
+    return analysis
+
+
+# Verwendung
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Google Takeout .mbox offline analysieren")
+    parser.add_argument('mbox', help="Pfad zur .mbox-Datei")
+    parser.add_argument('-o', '--output', default='email_analysis.json',
+                        help="Ziel-JSON für das Dashboard (Standard: email_analysis.json)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Anzahl Worker-Prozesse (Standard: alle CPU-Kerne)")
+    parser.add_argument('--days', type=int, default=None,
+                        help="Nur Emails der letzten N Tage (Standard: alle)")
+    args = parser.parse_args()
+
+    analysis = analyze_mbox(args.mbox, workers=args.workers, days_back=args.days)
+
+    print(f"\n📊 ANALYSIS REPORT:")
+    print(f"   📧 Emails insgesamt: {analysis['total_emails']}")
+    print(f"   📰 Newsletter gefunden: {len(analysis['newsletters'])}")
+    print(f"   💾 Große Emails (>5MB): {len(analysis['large_emails'])}")
+    print(f"   📏 Gesamtgröße: {analysis['total_size_mb']:.2f} MB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(analysis, f, ensure_ascii=False, indent=2)
+
+    print(f"📁 Detailanalyse in {args.output} gespeichert")
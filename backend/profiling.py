@@ -0,0 +1,84 @@
+# Profiling - cProfile-Mitschnitte pro Stage (CLI) bzw. pro Request (API)
+# Jeder Mitschnitt wird als .prof (pstats-Format, lesbar mit snakeviz, flameprof,
+# gprof2dot, ...) plus .json mit Tags (Stage, Dauer, Anzahl Nachrichten) gespeichert.
+
+import os
+import re
+import json
+import time
+import cProfile
+import itertools
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+PROFILE_DIR = 'profiles'
+
+# Laufende Nummer pro Prozess - parallele API-Requests in derselben Mikrosekunde
+_run_counter = itertools.count(1)
+
+# Nur ein aktiver cProfile pro Prozess - ab Python 3.12 wirft ein zweites
+# enable() "Another profiling tool is already active" (threaded Flask-Server)
+_active = threading.Lock()
+
+
+class Profiler:
+    """Optionaler cProfile-Wrapper - ohne enabled=True kostet stage() nichts"""
+
+    def __init__(self, enabled: bool = False, output_dir: str = PROFILE_DIR, run_name: str = 'run'):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.run_id = f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{next(_run_counter)}"
+        self.written = []
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Profiler starten (None wenn deaktiviert oder schon ein Profil läuft)"""
+        if not self.enabled or not _active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as error:
+            # z.B. externer Profiler/Debugger aktiv
+            _active.release()
+            print(f"⚠️  Profiling nicht möglich: {error}")
+            return None
+        return profile
+
+    def stop(self, profile: Optional[cProfile.Profile], stage: str, duration: float, tags: Dict) -> str:
+        """Profiler stoppen und Stats + Tags schreiben"""
+        if profile is None:
+            return ""
+        profile.disable()
+        _active.release()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"{self.run_id}_{re.sub(r'[^A-Za-z0-9_-]+', '_', stage).strip('_')}"
+        if 'messages' in tags:
+            name += f"_{tags['messages']}msgs"
+        path = os.path.join(self.output_dir, f"{name}.prof")
+
+        profile.dump_stats(path)
+        with open(os.path.join(self.output_dir, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                'run': self.run_id,
+                'stage': stage,
+                'duration_s': round(duration, 4),
+                'created': datetime.now().isoformat(),
+                **tags
+            }, f, ensure_ascii=False, indent=2)
+
+        self.written.append(path)
+        print(f"⏱️  Profil '{stage}' ({duration:.2f}s) gespeichert: {path}")
+        return path
+
+    @contextmanager
+    def stage(self, name: str, **tags):
+        """Block profilen - Tags (z.B. messages) können im Block ergänzt werden"""
+        profile = self.start()
+        started = time.perf_counter()
+        try:
+            yield tags
+        finally:
+            self.stop(profile, name, time.perf_counter() - started, tags)
@@ -0,0 +1,262 @@
+# Analyse-Snapshots - kompaktes Format mit Run-to-Run Diffs
+# Ein Snapshot ist ein LZMA-komprimiertes ZIP-Archiv:
+#   manifest.json                 Metadaten (Totals, Zeitpunkt, Spalten, Zeilenanzahl)
+#   <tabelle>/from.dict           JSON-Liste der eindeutigen Absender (Dictionary-Encoding)
+#   <tabelle>/from.codes          uint32-Indizes in das Dictionary
+#   <tabelle>/size.u32            Größe in Bytes als uint32
+#   columns.json                  alle übrigen Spalten roh, spaltenweise in einem Stream
+#                                 (inkl. Listen-Spalte message_ids aus dem Thread-Modus)
+# Nur Spalten mit wenigen eindeutigen Werten lohnen Dictionary-Encoding - IDs,
+# Betreffe und Unsubscribe-URLs sind fast alle verschieden und komprimieren
+# zusammen in einem LZMA-Stream am besten. Der Diff liest nur Absender + Größen.
+
+import os
+import sys
+import json
+import zipfile
+from array import array
+from email.utils import parseaddr
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_EXTENSION = '.ecs'
+
+# String-Spalten pro Tabelle
+STRING_COLUMNS = {
+    'newsletters': ['id', 'from', 'subject', 'unsubscribe_link'],
+    'large_emails': ['id', 'from', 'subject']
+}
+# Davon dictionary-kodiert (wenige eindeutige Werte, vom Diff einzeln gelesen)
+DICTIONARY_COLUMNS = {'from'}
+# Listen-Spalten - nur geschrieben, wenn die Analyse sie enthält
+LIST_COLUMNS = {
+    'newsletters': ['message_ids']
+}
+RAW_COLUMNS_FILE = 'columns.json'
+
+BYTES_PER_MB = 1024 * 1024
+
+
+def _encode_strings(values: List[str]):
+    """Strings in Dictionary + uint32-Codes zerlegen"""
+    dictionary = {}
+    codes = array('I')
+    for value in values:
+        codes.append(dictionary.setdefault(value, len(dictionary)))
+    return list(dictionary), codes
+
+
+def write_snapshot(analysis: Dict, path: Optional[str] = None) -> str:
+    """Analyse-Ergebnis als komprimierten Spalten-Snapshot speichern"""
+    created = datetime.now()
+    if path is None:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = os.path.join(
+            SNAPSHOT_DIR,
+            f"analysis_{created.strftime('%Y%m%d_%H%M%S')}{SNAPSHOT_EXTENSION}"
+        )
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'created': created.isoformat(),
+        'total_emails': analysis.get('total_emails', 0),
+        'total_size_mb': analysis.get('total_size_mb', 0),
+        'granularity': analysis.get('granularity', 'message'),
+        'tables': {}
+    }
+    if 'source' in analysis:
+        manifest['source'] = analysis['source']
+
+    raw_columns = {}
+
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_LZMA) as archive:
+        for table, columns in STRING_COLUMNS.items():
+            rows = analysis.get(table, [])
+            raw_columns[table] = {}
+
+            for column in columns:
+                values = [row.get(column, '') for row in rows]
+                if column not in DICTIONARY_COLUMNS:
+                    raw_columns[table][column] = values
+                    continue
+                dictionary, codes = _encode_strings(values)
+                archive.writestr(f'{table}/{column}.dict',
+                                 json.dumps(dictionary, ensure_ascii=False, separators=(',', ':')))
+                archive.writestr(f'{table}/{column}.codes', codes.tobytes())
+
+            list_columns = [
+                column for column in LIST_COLUMNS.get(table, [])
+                if any(column in row for row in rows)
+            ]
+            for column in list_columns:
+                raw_columns[table][column] = [row.get(column, []) for row in rows]
+
+            # size_mb verlustfrei als Bytes speichern (Gmail sizeEstimate ist ganzzahlig)
+            sizes = array('I', (round(row.get('size_mb', 0) * BYTES_PER_MB) for row in rows))
+            archive.writestr(f'{table}/size.u32', sizes.tobytes())
+
+            manifest['tables'][table] = {
+                'rows': len(rows),
+                'columns': columns + list_columns + ['size_mb']
+            }
+
+        archive.writestr(RAW_COLUMNS_FILE,
+                         json.dumps(raw_columns, ensure_ascii=False, separators=(',', ':')))
+        archive.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    return path
+
+
+class Snapshot:
+    """Lesezugriff auf einen Snapshot - Spalten werden erst bei Bedarf geladen"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.archive = zipfile.ZipFile(path, 'r')
+        self.manifest = json.loads(self.archive.read('manifest.json'))
+        if self.manifest.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unbekannte Snapshot-Version: {self.manifest.get('version')}")
+        self._raw_columns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.archive.close()
+
+    def rows(self, table: str) -> int:
+        """Anzahl Zeilen einer Tabelle"""
+        return self.manifest['tables'][table]['rows']
+
+    def dictionary(self, table: str, column: str) -> List[str]:
+        """Nur die eindeutigen Werte einer Spalte (ohne Codes zu dekodieren)"""
+        return json.loads(self.archive.read(f'{table}/{column}.dict'))
+
+    def column(self, table: str, column: str) -> List:
+        """Eine Spalte vollständig dekodieren"""
+        if column == 'size_mb':
+            sizes = array('I')
+            sizes.frombytes(self.archive.read(f'{table}/size.u32'))
+            return [size / BYTES_PER_MB for size in sizes]
+
+        if column not in DICTIONARY_COLUMNS:
+            if self._raw_columns is None:
+                self._raw_columns = json.loads(self.archive.read(RAW_COLUMNS_FILE))
+            return self._raw_columns[table][column]
+
+        dictionary = self.dictionary(table, column)
+        codes = array('I')
+        codes.frombytes(self.archive.read(f'{table}/{column}.codes'))
+        return [dictionary[code] for code in codes]
+
+    def table(self, table: str, columns: Optional[List[str]] = None) -> List[Dict]:
+        """Tabelle als Liste von Dicts - optional nur ausgewählte Spalten"""
+        columns = columns or self.manifest['tables'][table]['columns']
+        data = {column: self.column(table, column) for column in columns}
+        return [
+            {column: data[column][i] for column in columns}
+            for i in range(self.rows(table))
+        ]
+
+    def to_analysis(self) -> Dict:
+        """Snapshot zurück in das email_analysis.json-Format wandeln"""
+        analysis = {
+            'total_emails': self.manifest['total_emails'],
+            'granularity': self.manifest.get('granularity', 'message'),
+            'newsletters': self.table('newsletters'),
+            'large_emails': self.table('large_emails'),
+            'old_emails': [],
+            'total_size_mb': self.manifest['total_size_mb']
+        }
+        if 'source' in self.manifest:
+            analysis['source'] = self.manifest['source']
+        return analysis
+
+
+def _sender_addresses(senders: List[str]) -> set:
+    """Absender auf die Adresse normalisieren - Anzeigenamen ändern sich zwischen Runs"""
+    addresses = set()
+    for sender in senders:
+        address = parseaddr(sender)[1].lower()
+        addresses.add(address or sender.strip().lower())
+    return addresses
+
+
+def diff_snapshots(old_path: str, new_path: str) -> Dict:
+    """Neue/verschwundene Absender und Speicheränderung zwischen zwei Snapshots"""
+    with Snapshot(old_path) as old, Snapshot(new_path) as new:
+        old_senders = _sender_addresses(old.dictionary('newsletters', 'from'))
+        new_senders = _sender_addresses(new.dictionary('newsletters', 'from'))
+
+        old_newsletter_mb = sum(old.column('newsletters', 'size_mb'))
+        new_newsletter_mb = sum(new.column('newsletters', 'size_mb'))
+
+        return {
+            'old': {'path': old_path, 'created': old.manifest['created']},
+            'new': {'path': new_path, 'created': new.manifest['created']},
+            'new_senders': sorted(new_senders - old_senders),
+            'cleared_senders': sorted(old_senders - new_senders),
+            'newsletter_count_change': new.rows('newsletters') - old.rows('newsletters'),
+            'total_size_mb_change': new.manifest['total_size_mb'] - old.manifest['total_size_mb'],
+            'newsletter_size_mb_change': new_newsletter_mb - old_newsletter_mb
+        }
+
+
+def list_snapshots(directory: str = SNAPSHOT_DIR) -> List[str]:
+    """Alle Snapshots eines Verzeichnisses, älteste zuerst"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(SNAPSHOT_EXTENSION)
+    )
+
+
+def print_diff(diff: Dict):
+    """Diff lesbar ausgeben"""
+    print(f"📊 SNAPSHOT DIFF: {diff['old']['created']} → {diff['new']['created']}")
+    print(f"   📰 Newsletter: {diff['newsletter_count_change']:+d}")
+    print(f"   📏 Gesamtgröße: {diff['total_size_mb_change']:+.2f} MB")
+    print(f"   💾 Newsletter-Speicher: {diff['newsletter_size_mb_change']:+.2f} MB")
+    print(f"\n🆕 Neue Absender ({len(diff['new_senders'])}):")
+    for sender in diff['new_senders']:
+        print(f"   + {sender}")
+    print(f"\n✅ Verschwundene Absender ({len(diff['cleared_senders'])}):")
+    for sender in diff['cleared_senders']:
+        print(f"   - {sender}")
+
+
+# Verwendung
+if __name__ == "__main__":
+    usage = (
+        "Verwendung:\n"
+        "  python snapshot.py convert <email_analysis.json> [snapshot.ecs]\n"
+        "  python snapshot.py export <snapshot.ecs> <email_analysis.json>\n"
+        "  python snapshot.py diff [alt.ecs neu.ecs]   (ohne Argumente: letzte zwei Snapshots)"
+    )
+    args = sys.argv[1:]
+
+    if args[:1] == ['convert'] and len(args) in (2, 3):
+        with open(args[1], 'r', encoding='utf-8') as f:
+            path = write_snapshot(json.load(f), args[2] if len(args) == 3 else None)
+        print(f"📁 Snapshot gespeichert: {path} ({os.path.getsize(path)} Bytes)")
+    elif args[:1] == ['export'] and len(args) == 3:
+        with Snapshot(args[1]) as snapshot:
+            analysis = snapshot.to_analysis()
+        with open(args[2], 'w', encoding='utf-8') as f:
+            json.dump(analysis, f, ensure_ascii=False, indent=2)
+        print(f"📁 Analyse exportiert: {args[2]}")
+    elif args[:1] == ['diff'] and len(args) in (1, 3):
+        paths = args[1:] or list_snapshots()[-2:]
+        if len(paths) < 2:
+            print("❌ Mindestens zwei Snapshots nötig")
+        else:
+            print_diff(diff_snapshots(paths[0], paths[1]))
+    else:
+        print(usage)
@@ -0,0 +1,218 @@
+# Unsubscribe-Cache - merkt sich Ergebnisse pro URL, Absender und Host
+# Erfolge gelten SUCCESS_TTL lang, Fehlschläge werden mit exponentiellem Backoff
+# negativ gecacht. Hosts mit DNS-Fehlern oder Timeouts werden ebenfalls pausiert,
+# damit tote Server nicht bei jedem Lauf den vollen Timeout kosten.
+# Änderungen werden nur im Speicher gesammelt - save() schreibt einmal pro Lauf/Request.
+
+import os
+import json
+import time
+import socket
+import threading
+from email.utils import parseaddr
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+SUCCESS_TTL = 30 * 24 * 3600       # Erfolgreiche Abmeldung 30 Tage merken
+FAILURE_BACKOFF = 3600             # Erster Retry nach 1 Stunde ...
+MAX_BACKOFF = 7 * 24 * 3600        # ... maximal nach 7 Tagen
+DNS_TTL = 3600                     # Aufgelöste Hosts 1 Stunde merken
+FORGET_AFTER = MAX_BACKOFF         # Abgelaufene Fehlschläge so lange für den Backoff behalten
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """URL vereinheitlichen: Schema/Host klein, Standard-Port und Fragment weg, Query sortiert"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def normalize_sender(sender: str) -> str:
+    """Absender auf die reine Email-Adresse reduzieren"""
+    return parseaddr(sender)[1].lower()
+
+
+def sender_key(sender: str, url: str) -> str:
+    """Absender + Host der Unsubscribe-URL - ein Absender kann mehrere Listen haben"""
+    address = normalize_sender(sender)
+    host = (urlsplit(url).hostname or '').lower()
+    if not address or not host:
+        return ""
+    return f"{address}|{host}"
+
+
+def _backoff(failures: int) -> float:
+    """Wartezeit nach n Fehlschlägen (1h, 2h, 4h, ... max. 7 Tage)"""
+    return min(FAILURE_BACKOFF * 2 ** max(failures - 1, 0), MAX_BACKOFF)
+
+
+class UnsubscribeCache:
+    """Persistenter Outcome-Cache für Unsubscribe-Requests"""
+
+    def __init__(self, path: str = 'unsubscribe_cache.json'):
+        self.path = path
+        self.data = {'urls': {}, 'senders': {}, 'hosts': {}}
+        self.dirty = False
+        # Flask bedient Requests in Threads - Änderungen und save() serialisieren
+        self.lock = threading.RLock()
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data.update(json.load(f))
+            except (OSError, ValueError) as error:
+                print(f"⚠️  Unsubscribe-Cache konnte nicht geladen werden: {error}")
+        self.prune()
+
+    def prune(self):
+        """Abgelaufene Einträge entfernen (Fehlschläge erst nach FORGET_AFTER)"""
+        now = time.time()
+        with self.lock:
+            urls = self.data['urls']
+            for key in [k for k, e in urls.items()
+                        if e['expires'] + (0 if e['success'] else FORGET_AFTER) <= now]:
+                del urls[key]
+                self.dirty = True
+
+            senders = self.data['senders']
+            for key in [k for k, e in senders.items() if e['expires'] <= now]:
+                del senders[key]
+                self.dirty = True
+
+            hosts = self.data['hosts']
+            for key in [k for k, e in hosts.items()
+                        if e['resolved_until'] <= now and e['retry_after'] + FORGET_AFTER <= now]:
+                del hosts[key]
+                self.dirty = True
+
+    def save(self):
+        """Gesammelte Änderungen einmal atomar auf Platte schreiben"""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.prune()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            except OSError as error:
+                print(f"⚠️  Unsubscribe-Cache konnte nicht gespeichert werden: {error}")
+
+    def host_available(self, host: str) -> bool:
+        """Host-Health prüfen: Backoff aktiv? DNS (gecacht) auflösbar?"""
+        now = time.time()
+        with self.lock:
+            entry = self.data['hosts'].get(host, {'retry_after': 0, 'resolved_until': 0})
+            if entry['retry_after'] > now:
+                return False
+            if entry['resolved_until'] >= now:
+                return True
+
+        # DNS außerhalb des Locks - blockiert sonst alle anderen Requests
+        try:
+            socket.getaddrinfo(host, None)
+        except socket.gaierror:
+            self.record_host_failure(host)
+            return False
+
+        with self.lock:
+            entry = self.data['hosts'].setdefault(host, {'failures': 0, 'retry_after': 0, 'resolved_until': 0})
+            entry['resolved_until'] = now + DNS_TTL
+            self.dirty = True
+        return True
+
+    def sender_unsubscribed(self, url: str, sender: str = "") -> bool:
+        """Absender bei diesem Host schon abgemeldet? (URLs mit eigenem Token pro Email)"""
+        key = sender_key(sender, url)
+        if not key:
+            return False
+        with self.lock:
+            entry = self.data['senders'].get(key)
+            return bool(entry) and entry['expires'] > time.time()
+
+    def lookup(self, url: str) -> Optional[bool]:
+        """True = URL bereits abgemeldet, False = übersprungen (negativ gecacht), None = Request nötig"""
+        now = time.time()
+
+        with self.lock:
+            entry = self.data['urls'].get(normalize_url(url))
+            if entry and entry['expires'] > now:
+                return entry['success']
+
+        host = urlsplit(url).hostname
+        if host and not self.host_available(host.lower()):
+            return False
+
+        return None
+
+    def record_success(self, url: str, sender: str = ""):
+        """Erfolgreiche Abmeldung für URL, Absender und Host merken"""
+        now = time.time()
+        with self.lock:
+            self.data['urls'][normalize_url(url)] = {
+                'success': True,
+                'failures': 0,
+                'checked': now,
+                'expires': now + SUCCESS_TTL
+            }
+
+            key = sender_key(sender, url)
+            if key:
+                self.data['senders'][key] = {'checked': now, 'expires': now + SUCCESS_TTL}
+
+            host = urlsplit(url).hostname
+            if host:
+                entry = self.data['hosts'].setdefault(host.lower(), {'resolved_until': 0})
+                entry.update({'failures': 0, 'retry_after': 0})
+
+            self.dirty = True
+
+    def record_failure(self, url: str, host_error: bool = False):
+        """Fehlschlag negativ cachen - bei Verbindungsfehlern auch den Host pausieren"""
+        now = time.time()
+        key = normalize_url(url)
+        with self.lock:
+            failures = self.data['urls'].get(key, {}).get('failures', 0) + 1
+            self.data['urls'][key] = {
+                'success': False,
+                'failures': failures,
+                'checked': now,
+                'expires': now + _backoff(failures)
+            }
+            self.dirty = True
+
+            host = urlsplit(url).hostname
+            if host_error and host:
+                self.record_host_failure(host.lower())
+
+    def record_host_failure(self, host: str):
+        """Host nach DNS-Fehler/Timeout mit Backoff sperren"""
+        with self.lock:
+            entry = self.data['hosts'].setdefault(host, {'failures': 0, 'retry_after': 0, 'resolved_until': 0})
+            entry['failures'] = entry.get('failures', 0) + 1
+            entry['retry_after'] = time.time() + _backoff(entry['failures'])
+            entry['resolved_until'] = 0
+            self.dirty = True
+
+    def stats(self) -> Dict:
+        """Kurzüberblick über den Cache-Inhalt"""
+        now = time.time()
+        with self.lock:
+            urls = list(self.data['urls'].values())
+            senders = list(self.data['senders'].values())
+            hosts = list(self.data['hosts'].values())
+        return {
+            'successful_urls': sum(1 for e in urls if e['success'] and e['expires'] > now),
+            'failed_urls': sum(1 for e in urls if not e['success'] and e['expires'] > now),
+            'senders': sum(1 for e in senders if e['expires'] > now),
+            'hosts_in_backoff': sum(1 for e in hosts if e['retry_after'] > now)
+        }
@@ -0,0 +1,106 @@
+/**
+ * Analysis Worker - JSON-Parsing und Chart-Aggregation abseits des Main Threads
+ * Läuft als Web Worker, wird aber zusätzlich als normales Script geladen,
+ * damit das Dashboard ohne Worker-Support (z.B. file://) darauf zurückfallen kann.
+ */
+
+self.EmailAggregation = (function() {
+    'use strict';
+
+    // Anzahl Newsletter pro Nachricht an den Main Thread
+    const ROW_CHUNK_SIZE = 2000;
+
+    /**
+     * Alle Kennzahlen für Statistiken und Charts in einem Durchlauf berechnen
+     */
+    function aggregateEmailData(data) {
+        const newsletters = data.newsletters || [];
+        const senderCount = {};
+        const dateCount = {};
+        const today = new Date().toISOString().split('T')[0];
+        let newsletterSize = 0;
+        let withUnsubscribe = 0;
+
+        for (let i = 0; i < newsletters.length; i++) {
+            const newsletter = newsletters[i];
+            newsletterSize += newsletter.size_mb || 0;
+            if (newsletter.unsubscribe_link) withUnsubscribe++;
+
+            // Domain aus Absender extrahieren
+            const sender = newsletter.from || 'Unbekannt';
+            const domain = sender.includes('@') ? sender.split('@')[1] : sender;
+            senderCount[domain] = (senderCount[domain] || 0) + 1;
+
+            const date = newsletter.date || today;
+            dateCount[date] = (dateCount[date] || 0) + 1;
+        }
+
+        // Top 5 Absender
+        const topSenders = Object.entries(senderCount)
+            .sort(([,a], [,b]) => b - a)
+            .slice(0, 5);
+
+        // Nach Datum sortiert, letzte 30 Tage
+        const timeline = Object.entries(dateCount)
+            .sort(([a], [b]) => new Date(a) - new Date(b))
+            .slice(-30);
+
+        return {
+            total_emails: data.total_emails || 0,
+            total_size_mb: data.total_size_mb || 0,
+            newsletter_count: newsletters.length,
+            newsletter_size_mb: newsletterSize,
+            with_unsubscribe: withUnsubscribe,
+            large_email_count: data.large_emails?.length || 0,
+            top_senders: topSenders,
+            timeline: timeline
+        };
+    }
+
+    /**
+     * Erst Zusammenfassung, dann Newsletter-Zeilen in Chunks senden
+     */
+    function streamEmailData(data, post) {
+        const { newsletters = [], ...meta } = data;
+
+        post({
+            type: 'summary',
+            meta: meta,
+            aggregates: aggregateEmailData(data),
+            total_rows: newsletters.length
+        });
+
+        for (let offset = 0; offset < newsletters.length; offset += ROW_CHUNK_SIZE) {
+            post({
+                type: 'rows',
+                offset: offset,
+                rows: newsletters.slice(offset, offset + ROW_CHUNK_SIZE)
+            });
+        }
+
+        post({ type: 'done' });
+    }
+
+    return {
+        aggregateEmailData,
+        streamEmailData,
+        ROW_CHUNK_SIZE
+    };
+
+})();
+
+// Nur im Worker-Kontext auf Nachrichten hören
+if (typeof WorkerGlobalScope !== 'undefined' && self instanceof WorkerGlobalScope) {
+    self.onmessage = function(e) {
+        // requestId zurückgeben - der Main Thread verwirft Nachrichten älterer Läufe
+        const { file, data, requestId } = e.data;
+        try {
+            const parsed = data || JSON.parse(new FileReaderSync().readAsText(file));
+            self.EmailAggregation.streamEmailData(
+                parsed, (message) => self.postMessage({ ...message, requestId })
+            );
+        } catch (error) {
+            self.postMessage({ type: 'error', message: error.message, requestId });
+        }
+    };
+}
@@ -1,6 +1,7 @@
 /**
  * Charts Module - Specialized chart creation and management
  * Uses Chart.js for data visualization
+ * Expects aggregates precomputed by EmailAggregation (analysis_worker.js)
  */
 
 window.Charts = (function() {
@@ -51,15 +52,15 @@ window.Charts = (function() {
     /**
      * Create email distribution donut chart
      */
-    function createEmailDistributionChart(data) {
+    function createEmailDistributionChart(stats) {
         const ctx = document.getElementById('emailDistributionChart');
         if (!ctx) {
             console.error('Email distribution chart canvas not found');
             return null;
         }
 
-        const newsletterCount = data.newsletters?.length || 0;
-        const totalEmails = data.total_emails || 0;
+        const newsletterCount = stats.newsletter_count;
+        const totalEmails = stats.total_emails;
         const regularEmails = Math.max(0, totalEmails - newsletterCount);
 
         // Calculate percentages
@@ -116,16 +117,15 @@ window.Charts = (function() {
     /**
      * Create storage analysis bar chart
      */
-    function createStorageAnalysisChart(data) {
+    function createStorageAnalysisChart(stats) {
         const ctx = document.getElementById('storageAnalysisChart');
         if (!ctx) {
             console.error('Storage analysis chart canvas not found');
             return null;
         }
 
-        const newsletters = data.newsletters || [];
-        const newsletterSize = newsletters.reduce((sum, n) => sum + (n.size_mb || 0), 0);
-        const totalSize = data.total_size_mb || 0;
+        const newsletterSize = stats.newsletter_size_mb;
+        const totalSize = stats.total_size_mb;
         const regularSize = Math.max(0, totalSize - newsletterSize);
 
         // Calculate percentages
@@ -207,23 +207,11 @@ window.Charts = (function() {
     /**
      * Create sender analysis chart (for future use)
      */
-    function createSenderAnalysisChart(data) {
-        const newsletters = data.newsletters || [];
-        if (newsletters.length === 0) return null;
-
-        // Analyze senders
-        const senderCount = {};
-        newsletters.forEach(newsletter => {
-            const sender = newsletter.from || 'Unbekannt';
-            // Extract domain from email
-            const domain = sender.includes('@') ? sender.split('@')[1] : sender;
-            senderCount[domain] = (senderCount[domain] || 0) + 1;
-        });
-
-        // Get top 5 senders
-        const topSenders = Object.entries(senderCount)
-            .sort(([,a], [,b]) => b - a)
-            .slice(0, 5);
+    function createSenderAnalysisChart(stats) {
+        if (stats.newsletter_count === 0) return null;
+
+        // Top 5 senders (by domain)
+        const topSenders = stats.top_senders;
 
         const chartData = {
             labels: topSenders.map(([domain]) => domain),
@@ -251,21 +239,11 @@ window.Charts = (function() {
     /**
      * Create timeline chart showing newsletter frequency over time
      */
-    function createTimelineChart(data) {
-        const newsletters = data.newsletters || [];
-        if (newsletters.length === 0) return null;
-
-        // Group newsletters by date
-        const dateCount = {};
-        newsletters.forEach(newsletter => {
-            const date = newsletter.date || new Date().toISOString().split('T')[0];
-            dateCount[date] = (dateCount[date] || 0) + 1;
-        });
-
-        // Sort by date and get last 30 days
-        const sortedDates = Object.entries(dateCount)
-            .sort(([a], [b]) => new Date(a) - new Date(b))
-            .slice(-30);
+    function createTimelineChart(stats) {
+        if (stats.newsletter_count === 0) return null;
+
+        // Last 30 days, sorted by date
+        const sortedDates = stats.timeline;
 
         const chartData = {
             labels: sortedDates.map(([date]) => {
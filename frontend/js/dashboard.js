@@ -3,10 +3,18 @@
  * Komplett funktionierende Lösung mit allen Features
  */
 
+// Feste Zeilenhöhe für die virtualisierte Newsletter-Liste (inkl. Abstand)
+const NEWSLETTER_ROW_HEIGHT = 80;
+
 class EmailDashboard {
     constructor() {
         this.emailData = null;
+        this.aggregates = null;
         this.charts = {};
+        this.worker = null;
+        this.pendingAnalysis = null;
+        this.analysisId = 0;  // Nachrichten älterer Analysen verwerfen
+        this.newsletterList = null;
         console.log('📧 Email Dashboard initializing...');
         this.init();
     }
@@ -143,27 +151,127 @@ class EmailDashboard {
         // Show loading state
         this.showLoading();
 
-        // Read file
+        // Parsing und Aggregation im Worker
+        this.startAnalysis({ file: file });
+    }
+
+    /**
+     * Start analysis in a Web Worker (fallback: main thread)
+     */
+    startAnalysis(payload) {
+        this.emailData = null;
+        this.aggregates = null;
+        payload = { ...payload, requestId: ++this.analysisId };
+        this.pendingAnalysis = payload;
+
+        const worker = this.getWorker();
+        if (worker) {
+            worker.postMessage(payload);
+        } else {
+            this.analyzeOnMainThread(payload);
+        }
+    }
+
+    /**
+     * Lazily create the analysis worker
+     */
+    getWorker() {
+        if (this.worker) return this.worker;
+        if (!window.Worker) return null;
+
+        try {
+            this.worker = new Worker('js/analysis_worker.js');
+            this.worker.onmessage = (e) => this.handleAnalysisMessage(e.data);
+            this.worker.onerror = (e) => {
+                // z.B. file:// - Worker kann nicht geladen werden
+                e.preventDefault();
+                console.warn('⚠️ Analysis worker failed, falling back to main thread:', e.message);
+                this.worker.terminate();
+                this.worker = null;
+                if (this.pendingAnalysis) {
+                    this.analyzeOnMainThread(this.pendingAnalysis);
+                }
+            };
+            console.log('✅ Analysis worker started');
+        } catch (error) {
+            console.warn('⚠️ Web Worker not available:', error);
+            this.worker = null;
+        }
+
+        return this.worker;
+    }
+
+    /**
+     * Fallback: parse and aggregate without a worker
+     */
+    analyzeOnMainThread(payload) {
+        const requestId = payload.requestId;
+        const stream = (data) => window.EmailAggregation.streamEmailData(
+            data, (message) => this.handleAnalysisMessage({ ...message, requestId })
+        );
+
+        if (payload.data) {
+            stream(payload.data);
+            return;
+        }
+
         const reader = new FileReader();
         reader.onload = (e) => {
             try {
-                const jsonData = JSON.parse(e.target.result);
-                console.log('✅ JSON parsed successfully:', Object.keys(jsonData));
-                this.emailData = jsonData;
-                this.processEmailData();
+                stream(JSON.parse(e.target.result));
             } catch (error) {
-                console.error('❌ JSON Parse Error:', error);
-                this.showError('❌ Fehler beim Laden der JSON-Datei: ' + error.message);
-                this.hideLoading();
+                this.handleAnalysisMessage({ type: 'error', message: error.message, requestId });
             }
         };
 
         reader.onerror = () => {
+            if (requestId !== this.analysisId) return;
             this.showError('❌ Fehler beim Lesen der Datei');
             this.hideLoading();
         };
 
-        reader.readAsText(file);
+        reader.readAsText(payload.file);
+    }
+
+    /**
+     * Handle summary/rows/done messages streamed from the analysis
+     */
+    handleAnalysisMessage(message) {
+        // Noch gequeuete Nachrichten einer vorherigen Datei ignorieren
+        if (message.requestId !== this.analysisId) return;
+
+        switch (message.type) {
+            case 'summary':
+                console.log('✅ JSON parsed successfully:', Object.keys(message.meta), message.total_rows, 'newsletters');
+                this.emailData = { ...message.meta, newsletters: [] };
+                this.aggregates = message.aggregates;
+                this.processEmailData();
+                break;
+
+            case 'rows':
+                for (let i = 0; i < message.rows.length; i++) {
+                    this.emailData.newsletters.push(message.rows[i]);
+                }
+                if (this.newsletterList) {
+                    this.newsletterList.refresh();
+                } else {
+                    this.populateNewsletterList();
+                }
+                break;
+
+            case 'done':
+                this.pendingAnalysis = null;
+                if (!this.newsletterList) this.populateNewsletterList();
+                console.log('✅ Newsletter list complete:', this.emailData.newsletters.length);
+                break;
+
+            case 'error':
+                this.pendingAnalysis = null;
+                console.error('❌ JSON Parse Error:', message.message);
+                this.showError('❌ Fehler beim Laden der JSON-Datei: ' + message.message);
+                this.hideLoading();
+                break;
+        }
     }
 
     /**
@@ -172,13 +280,10 @@ class EmailDashboard {
     processEmailData() {
         console.log('📊 Processing email data...');
         
-        // Simulate processing time for better UX
-        setTimeout(() => {
-            this.hideLoading();
-            this.showDashboard();
-            this.populateDashboard();
-            console.log('✅ Dashboard populated with data');
-        }, 1000);
+        this.hideLoading();
+        this.showDashboard();
+        this.populateDashboard();
+        console.log('✅ Dashboard populated with data');
     }
 
     /**
@@ -223,14 +328,13 @@ class EmailDashboard {
      * Update statistics cards
      */
     updateStatistics() {
-        const data = this.emailData;
+        const stats = this.aggregates;
         
-        // Calculate metrics
-        const totalEmails = data.total_emails || 0;
-        const newsletterCount = data.newsletters?.length || 0;
-        const totalSize = (data.total_size_mb || 0).toFixed(1);
-        const potentialSavings = data.newsletters?.reduce((sum, newsletter) => 
-            sum + (newsletter.size_mb || 0), 0) || 0;
+        // Metrics kommen vorberechnet aus dem Worker
+        const totalEmails = stats.total_emails;
+        const newsletterCount = stats.newsletter_count;
+        const totalSize = stats.total_size_mb.toFixed(1);
+        const potentialSavings = stats.newsletter_size_mb;
 
         // Update DOM elements safely
         this.updateElement('totalEmails', totalEmails.toLocaleString());
@@ -286,8 +390,8 @@ class EmailDashboard {
         
         if (window.Charts) {
             try {
-                this.charts.emailDistribution = window.Charts.createEmailDistributionChart(this.emailData);
-                this.charts.storageAnalysis = window.Charts.createStorageAnalysisChart(this.emailData);
+                this.charts.emailDistribution = window.Charts.createEmailDistributionChart(this.aggregates);
+                this.charts.storageAnalysis = window.Charts.createStorageAnalysisChart(this.aggregates);
                 console.log('✅ Charts rendered successfully');
             } catch (error) {
                 console.error('❌ Error rendering charts:', error);
@@ -310,7 +414,7 @@ class EmailDashboard {
     }
 
     /**
-     * Populate newsletter list
+     * Populate newsletter list (virtualized - only visible rows are rendered)
      */
     populateNewsletterList() {
         const listContainer = document.getElementById('newsletterList');
@@ -319,30 +423,48 @@ class EmailDashboard {
         const newsletters = this.emailData.newsletters || [];
         
         // Clear existing content
+        this.destroyNewsletterList();
         listContainer.innerHTML = '';
 
         if (newsletters.length === 0) {
+            // Zeilen kommen evtl. noch aus dem Worker
+            if (this.pendingAnalysis) return;
             listContainer.innerHTML = '<div class="newsletter-empty">Keine Newsletter gefunden.</div>';
             return;
         }
 
         console.log('📰 Populating newsletter list with', newsletters.length, 'newsletters');
 
-        // Display first 10 newsletters
-        const displayCount = Math.min(newsletters.length, 10);
-        
-        for (let i = 0; i < displayCount; i++) {
-            const newsletter = newsletters[i];
-            const item = this.createNewsletterItem(newsletter);
-            listContainer.appendChild(item);
+        this.newsletterList = new VirtualList(listContainer, {
+            rowHeight: NEWSLETTER_ROW_HEIGHT,
+            renderRow: (newsletter) => this.createNewsletterItem(newsletter)
+        });
+        this.newsletterList.setItems(newsletters);
+    }
+
+    /**
+     * Remove a newsletter (e.g. after delete/unsubscribe) from data and list
+     */
+    removeNewsletter(emailId) {
+        const newsletters = this.emailData?.newsletters || [];
+        const index = newsletters.findIndex(n => n.id === emailId);
+        if (index === -1) return;
+
+        if (this.newsletterList) {
+            // VirtualList teilt sich das Array mit emailData
+            this.newsletterList.removeItem(index);
+        } else {
+            newsletters.splice(index, 1);
         }
+    }
 
-        // Show "more" indicator if needed
-        if (newsletters.length > 10) {
-            const moreItem = document.createElement('div');
-            moreItem.className = 'newsletter-more';
-            moreItem.textContent = `... und ${newsletters.length - 10} weitere Newsletter`;
-            listContainer.appendChild(moreItem);
+    /**
+     * Destroy the virtual newsletter list
+     */
+    destroyNewsletterList() {
+        if (this.newsletterList) {
+            this.newsletterList.destroy();
+            this.newsletterList = null;
         }
     }
 
@@ -352,6 +474,7 @@ class EmailDashboard {
     createNewsletterItem(newsletter) {
         const item = document.createElement('div');
         item.className = 'newsletter-item';
+        if (newsletter.id) item.dataset.emailId = newsletter.id;
         
         const subject = this.sanitizeText(newsletter.subject || 'Kein Betreff');
         const from = this.sanitizeText(newsletter.from || 'Unbekannt');
@@ -434,13 +557,10 @@ class EmailDashboard {
             ]
         };
         
-        this.emailData = demoData;
-        
         const uploadSection = document.querySelector('.upload-section');
         if (uploadSection) uploadSection.style.display = 'none';
         
-        this.showDashboard();
-        this.populateDashboard();
+        this.startAnalysis({ data: demoData });
         
         console.log('✅ Demo data loaded successfully');
     }
@@ -470,8 +590,8 @@ class EmailDashboard {
      */
     generateReport() {
         const data = this.emailData;
-        const newsletterCount = data.newsletters?.length || 0;
-        const potentialSavings = data.newsletters?.reduce((sum, n) => sum + (n.size_mb || 0), 0) || 0;
+        const newsletterCount = this.aggregates.newsletter_count;
+        const potentialSavings = this.aggregates.newsletter_size_mb;
         
         return {
             generated: new Date().toISOString(),
@@ -597,7 +717,13 @@ class EmailDashboard {
      */
     destroy() {
         this.destroyExistingCharts();
+        this.destroyNewsletterList();
+        if (this.worker) {
+            this.worker.terminate();
+            this.worker = null;
+        }
         this.emailData = null;
+        this.aggregates = null;
         console.log('🧹 Dashboard destroyed');
     }
 }
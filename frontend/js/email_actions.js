@@ -38,17 +38,20 @@ class EmailAPI {
         return this.request(`/email/${emailId}/unsubscribe`, { method: 'POST' });
     }
     
-    static async bulkDelete(emailIds) {
+    // granularity 'thread': IDs sind Thread-IDs (Analyse mit --threads)
+    static async bulkDelete(emailIds, granularity = 'message') {
+        const key = granularity === 'thread' ? 'thread_ids' : 'email_ids';
         return this.request('/bulk-delete', {
             method: 'POST',
-            body: JSON.stringify({ email_ids: emailIds })
+            body: JSON.stringify({ [key]: emailIds })
         });
     }
     
-    static async bulkUnsubscribe(emailIds) {
+    static async bulkUnsubscribe(emailIds, granularity = 'message') {
+        const key = granularity === 'thread' ? 'thread_ids' : 'email_ids';
         return this.request('/bulk-unsubscribe', {
             method: 'POST',
-            body: JSON.stringify({ email_ids: emailIds })
+            body: JSON.stringify({ [key]: emailIds })
         });
     }
 }
@@ -127,7 +130,7 @@ function extendDashboardWithLiveActions() {
                 if (emailElement) {
                     emailElement.style.opacity = '0.5';
                     emailElement.style.textDecoration = 'line-through';
-                    setTimeout(() => emailElement.remove(), 1000);
+                    setTimeout(() => this.removeNewsletter(emailId), 1000);
                 }
             } else {
                 alert('❌ Fehler beim Löschen: ' + result.message);
@@ -151,7 +154,7 @@ function extendDashboardWithLiveActions() {
                 if (emailElement) {
                     emailElement.style.opacity = '0.5';
                     emailElement.style.background = '#d4edda';
-                    setTimeout(() => emailElement.remove(), 1500);
+                    setTimeout(() => this.removeNewsletter(emailId), 1500);
                 }
             } else {
                 alert('❌ Abmeldung fehlgeschlagen: ' + result.error);
@@ -170,6 +173,13 @@ function extendDashboardWithLiveActions() {
             return;
         }
         
+        // Offline-Analysen (mbox) haben keine Gmail-IDs
+        if (this.emailData.source === 'mbox') {
+            alert('📦 Offline-Analyse (mbox) - Live-Aktionen nur mit Gmail-Analyse möglich');
+            originalShowCleanupOptions.call(this);
+            return;
+        }
+        
         const withUnsubscribe = newsletters.filter(n => n.unsubscribe_link).length;
         
         const choice = prompt(
@@ -227,7 +237,7 @@ function extendDashboardWithLiveActions() {
             document.body.appendChild(progressDiv);
             
             console.log('📧 Starting bulk unsubscribe for', emailIds.length, 'emails');
-            const result = await EmailAPI.bulkUnsubscribe(emailIds);
+            const result = await EmailAPI.bulkUnsubscribe(emailIds, this.emailData.granularity);
             
             progressDiv.remove();
             alert(`✅ Abmeldung abgeschlossen!\nErfolgreich: ${result.successful_unsubscribes}/${result.total_processed}`);
@@ -274,7 +284,7 @@ function extendDashboardWithLiveActions() {
             document.body.appendChild(progressDiv);
             
             console.log('🗑️ Starting bulk delete for', emailIds.length, 'emails');
-            const result = await EmailAPI.bulkDelete(emailIds);
+            const result = await EmailAPI.bulkDelete(emailIds, this.emailData.granularity);
             
             progressDiv.remove();
             alert(`✅ Löschen abgeschlossen!\nErfolgreich: ${result.successful_deletions}/${result.total_processed}`);
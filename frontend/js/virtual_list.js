@@ -0,0 +1,113 @@
+/**
+ * Virtual List - rendert nur die sichtbaren Zeilen einer langen Liste
+ * Zeilen haben eine feste Höhe, der Rest wird durch einen Spacer simuliert.
+ */
+
+class VirtualList {
+    constructor(container, { rowHeight, renderRow, overscan = 5 }) {
+        this.container = container;
+        this.rowHeight = rowHeight;
+        this.renderRow = renderRow;
+        this.overscan = overscan;
+        this.items = [];
+        this.rows = new Map();  // index -> DOM element
+        this.frameRequested = false;
+
+        this.container.innerHTML = '';
+        this.container.classList.add('virtual-list');
+
+        this.spacer = document.createElement('div');
+        this.spacer.className = 'virtual-list-spacer';
+        this.container.appendChild(this.spacer);
+
+        this.onScroll = () => this.scheduleRender();
+        this.container.addEventListener('scroll', this.onScroll, { passive: true });
+    }
+
+    /**
+     * Neue Items setzen - alle gerenderten Zeilen verwerfen
+     */
+    setItems(items) {
+        this.items = items;
+        this.rows.forEach(row => row.remove());
+        this.rows.clear();
+        this.refresh();
+    }
+
+    /**
+     * Einzelnes Item entfernen - nachfolgende Zeilen rutschen nach
+     */
+    removeItem(index) {
+        if (index < 0 || index >= this.items.length) return;
+        this.items.splice(index, 1);
+        this.rows.forEach(row => row.remove());
+        this.rows.clear();
+        this.refresh();
+    }
+
+    /**
+     * Nach Anhängen von Items (gleiches Array) nur Höhe anpassen und neu rendern
+     */
+    refresh() {
+        this.spacer.style.height = `${this.items.length * this.rowHeight}px`;
+        this.scheduleRender();
+    }
+
+    /**
+     * Rendern auf den nächsten Frame bündeln
+     */
+    scheduleRender() {
+        if (this.frameRequested) return;
+        this.frameRequested = true;
+        requestAnimationFrame(() => {
+            this.frameRequested = false;
+            this.render();
+        });
+    }
+
+    /**
+     * Nur Zeilen im sichtbaren Bereich (plus Overscan) im DOM halten
+     */
+    render() {
+        const scrollTop = this.container.scrollTop;
+        const viewportHeight = this.container.clientHeight || 400;
+
+        const first = Math.max(0, Math.floor(scrollTop / this.rowHeight) - this.overscan);
+        const last = Math.min(
+            this.items.length,
+            Math.ceil((scrollTop + viewportHeight) / this.rowHeight) + this.overscan
+        );
+
+        // Zeilen außerhalb des Fensters entfernen
+        this.rows.forEach((row, index) => {
+            if (index < first || index >= last) {
+                row.remove();
+                this.rows.delete(index);
+            }
+        });
+
+        // Fehlende Zeilen gesammelt einfügen
+        const fragment = document.createDocumentFragment();
+        for (let i = first; i < last; i++) {
+            if (this.rows.has(i)) continue;
+
+            const row = this.renderRow(this.items[i], i);
+            row.classList.add('virtual-list-row');
+            row.style.top = `${i * this.rowHeight}px`;
+            this.rows.set(i, row);
+            fragment.appendChild(row);
+        }
+        this.spacer.appendChild(fragment);
+    }
+
+    /**
+     * Event Listener und Zeilen entfernen
+     */
+    destroy() {
+        this.container.removeEventListener('scroll', this.onScroll);
+        this.container.classList.remove('virtual-list');
+        this.rows.clear();
+        this.items = [];
+        this.container.innerHTML = '';
+    }
+}